@@ -1,9 +1,24 @@
+import functools
 import itertools
+import json
 import os
 
+@functools.lru_cache(maxsize=None)
+def get_tree_paths(json_path, amr_files, middleman_files, language_files):
+    """
+    Builds the (amr, middleman, language) path tuples once per set of (hashable) 
+    arguments. Tuples so the cached value can't be modified by callers
+    """
+    amr_paths    = tuple(f'{json_path}/amr_files/{amr_file}.json' for amr_file in amr_files)
+    middle_paths = tuple(f'{json_path}/middleman_files/{mid_file}.json' for mid_file in middleman_files)
+    lang_paths   = tuple(f'{json_path}/language_files/{lang_file}.json' for lang_file in language_files)
+    return amr_paths, middle_paths, lang_paths
+
 class PerantoTree:
     """
-    PerantoTree specifies a tree of files that config testperanto
+    PerantoTree specifies a tree of files that config testperanto.
+    If identity_mapping, each language file is used twice so that each 
+    language also gets a copy (SVO1, ...) to allow for identity mapping
     """
 
     def __init__(self, 
@@ -11,19 +26,34 @@ class PerantoTree:
             amr_files,
             middleman_files,
             language_files,
-            names
+            names,
+            identity_mapping=False
             ):
 
-        self.amr_paths    = [f'{json_path}/amr_files/{amr_file}.json' for amr_file in amr_files]
-        self.middle_paths = [f'{json_path}/middleman_files/{mid_file}.json' for mid_file in middleman_files]
-        self.lang_paths   = [f'{json_path}/language_files/{lang_file}.json' for lang_file in language_files]
-        self.lang_paths  += self.lang_paths # duplicate to allow for identity mapping
-        self.data         = [self.amr_paths, self.middle_paths, self.lang_paths]
-        self.names        = names #[SVO, OVS, ...]
-        self.dup_names    = [f'{name}1' for name in names] # duplicate for identity mapping
+        self.json_path       = json_path
+        self.amr_files       = list(amr_files)
+        self.middleman_files = list(middleman_files)
+        self.language_files  = list(language_files)
+        self.identity_mapping = identity_mapping
+
+        amr_paths, middle_paths, lang_paths = get_tree_paths(
+            json_path, tuple(amr_files), tuple(middleman_files), tuple(language_files))
+
+        self.amr_paths    = list(amr_paths)
+        self.middle_paths = list(middle_paths)
+        self.lang_paths   = list(lang_paths)
+        self.names        = list(names) #[SVO, OVS, ...]
+        self.dup_names    = []
+
+        if identity_mapping:
+            self.lang_paths_with_identity = self.lang_paths + self.lang_paths # duplicate to allow for identity mapping
+            self.dup_names = [f'{name}1' for name in names]                   # duplicate for identity mapping
+            self.data = [self.amr_paths, self.middle_paths, self.lang_paths_with_identity]
+        else:
+            self.data = [self.amr_paths, self.middle_paths, self.lang_paths]
 
         self.file_order = {i : name for i, name in enumerate(self.names + self.dup_names)} # SVO,  ..., SVo1, 
-        self.num_paths  = len(self.amr_paths) * len(self.middle_paths) * len(self.lang_paths)
+        self.num_paths  = len(self.data[0]) * len(self.data[1]) * len(self.data[2])      # num generated files
 
     def get(self):
         return self.data
@@ -31,8 +61,20 @@ class PerantoTree:
     def get_names(self):
         return self.names
 
+    def to_dict(self):
+        """
+        Convert to a dictionary of the constructor arguments (so it can be rebuilt)
+        """
+        return {
+            'json_path'       : self.json_path,
+            'amr_files'       : self.amr_files,
+            'middleman_files' : self.middleman_files,
+            'language_files'  : self.language_files,
+            'names'           : self.names,
+            'identity_mapping': self.identity_mapping
+            }
+
 class Config:
-    ### TO DO: check if from/to_dict are working/add reinitialization 
     
     def __init__(self): 
         self.exp_name     = 'svo_permutations'                              # exp name (don't put spaces or slashes or weird crap)
@@ -58,17 +100,15 @@ class Config:
             middleman_files = ['middleman'],                                # json_path/middleman_files/middleman.json
             language_files  = [f"english{''.join(p)}"                       # json_path/language_files/englishSVO.json ...
                                  for p in itertools.permutations("SVO")],
-            names           = ['SVO', 'SOV', 'VSO', 'VOS', 'OSV', 'OVS']
+            names           = ['SVO', 'SOV', 'VSO', 'VOS', 'OSV', 'OVS'],
+            identity_mapping = True                                         # also generate SVO1, ... for (SVO, SVO1) combos
             )
 
         self.corp_lens    = [1000 * (2 ** i) for i in range(10)]            # 1000, 2000, ..., 512000
         self.num_cores    = 32
        
         ### data processor configs 
-        self.num_trans    = 2                                               # if 2 takes pairs of languages, 3 triples, ...
-        combos = list((itertools.combinations(self.peranto_tree.names, self.num_trans)))
-        id_maps = [(name, f"{name}1") for name in self.peranto_tree.names]
-        self.combos       = combos + id_maps
+        self.num_trans    = 2                                               # if 2 takes pairs of languages, 3 triples, ... (see combos)
         self.train_size   = .8
         self.test_size    = .1
         self.dev_size     = .1
@@ -80,6 +120,16 @@ class Config:
 
         self.initialize()
 
+    @functools.cached_property
+    def combos(self):
+        """
+        Language combos to train on: all num_trans combinations of names plus,
+        with identity mapping, (name, name1) pairs. Built on first access.
+        """
+        names = self.peranto_tree.names
+        id_maps = ((name, f"{name}1") for name in names) if self.peranto_tree.identity_mapping else ()
+        return list(itertools.chain(itertools.combinations(names, self.num_trans), id_maps))
+
     def initialize(self):
         paths = [
             self.SRC_PATH,
@@ -94,7 +144,7 @@ class Config:
             f"{self.OUT_PATH}/temporary"
             ]
         
-        for path in paths:
+        for path in dict.fromkeys(paths):                                   # dedupe, keep order
             os.makedirs(path, exist_ok=True)
 
         ### check json_path has correct subfolders 
@@ -104,19 +154,42 @@ class Config:
         Update configuration from a dictionary.
         """
         for key, value in config_dict.items():
+            if key == 'peranto_tree' and isinstance(value, dict): # from to_dict()
+                value = PerantoTree(**value)
+            if key == 'combos': # json turns the tuples into lists
+                value = [tuple(combo) for combo in value]
             if hasattr(self, key):
                 setattr(self, key, value)
-        self.initalize()
+        if 'combos' not in config_dict:
+            self.__dict__.pop('combos', None) # rebuild from the new num_trans/peranto_tree
+        self.initialize()
 
     def to_dict(self):
         """
-        Convert configuration to a dictionary.
+        Convert configuration to a flat, json serializable dictionary.
         """
-        return self.__dict__
+        config_dict = {key : value for key, value in self.__dict__.items() 
+                        if not key.startswith('_') and isinstance(value, (str, int, float, list, tuple, dict))}
+        config_dict['peranto_tree'] = self.peranto_tree.to_dict()
+        config_dict['combos']       = self.combos
+        return config_dict
+
+    def __eq__(self, other):
+        return isinstance(other, Config) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        # based on the current values, so a Config must not be changed 
+        # (e.g. with from_dict) while it is used as a dict key/in a set
+        return hash(json.dumps(self.to_dict(), sort_keys=True))
     
     def __repr__(self):
         return str(self.to_dict())
 
 
 if __name__ == '__main__':
-    pass 
\ No newline at end of file
+    # check that to_dict/from_dict round trip (through json)
+    config = Config()
+    copy = Config()
+    copy.from_dict(json.loads(json.dumps(config.to_dict())))
+    assert copy == config, "Config.from_dict(Config.to_dict()) doesn't round trip"
+    print("Config round trip ok") 
\ No newline at end of file
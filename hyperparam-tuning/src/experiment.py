@@ -1,10 +1,21 @@
 import os 
+import copy
 import json
+import sys
 import random
 import argparse
+import functools
+import heapq
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
-import matplotlib.pyplot as plt 
+import pandas as pd
+
+try:
+    import orjson # optional, much faster json encoding
+except ImportError:
+    orjson = None
 
 from treebank import TripleStore
 from peranto_triples import PerantoTripleStore
@@ -12,6 +23,137 @@ from peranto_triples import PerantoTripleStore
 SRC_PATH  = os.getcwd()
 MAIN_PATH = os.path.dirname(SRC_PATH)
 PER_PATH  = os.path.dirname(MAIN_PATH)
+NUM_SENTS = 5897 # number of sentences generated per (S,D) pair
+SH_CORES  = 64   # cpus requested by the sh script, and worker processes it runs
+
+@functools.lru_cache(maxsize=None)
+def _read_base_json(path, mtime, size):
+    """Parses a base json file; mtime/size are part of the key so edits invalidate the cache"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+def load_base_json(path):
+    """
+    Returns the content of a base json config file. The parsed file is cached, and
+    only the distributions/rules (the parts that get modified) are copied.
+    """
+    stat = os.stat(path)
+    content = _read_base_json(path, stat.st_mtime_ns, stat.st_size)
+    return {
+        **content,
+        "distributions" : copy.deepcopy(content["distributions"]),
+        "rules"         : copy.deepcopy(content["rules"])
+        }
+
+def param_key(strength, discount):
+    """
+    (S, D) as ints, with discount in hundredths. Used as dict key and in filenames.
+    Truncates like the original filenames did (0.29 => d28), so existing setups still match
+    """
+    return int(strength), int(discount * 100)
+
+def dump_json(content, filename):
+    """Writes content to filename, using orjson if it is installed"""
+    if orjson is not None:
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(content, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=2, ensure_ascii=False) # same output as orjson
+
+def encode_columns(columns):
+    """
+    Encodes equal length columns (e.g. [subjects, verbs]) as an array of int64 
+    codes, one per row, where equal rows get equal codes. Each column is factorized 
+    into 32 bit codes which are then packed into one integer per row.
+    """
+    codes = np.zeros(len(columns[0]) if columns else 0, dtype=np.int64)
+    for column in columns:
+        column_codes, _ = pd.factorize(np.asarray(column, dtype=object))
+        codes <<= 32
+        codes |= column_codes
+    return codes
+
+def encode_rows(lst):
+    """Same as encode_columns(), for a list of (a,) or (a, b) tuples"""
+    return encode_columns(list(zip(*lst)))
+
+def generate_output(json_file, output_file, num_sents=NUM_SENTS):
+    """
+    Generates num_sents sentences from json_file followed by the svo middleman/english 
+    configs (with scripts/generate.py, same as its --sents) and saves them to output_file.
+    Module-level so that it can be sent to worker processes.
+    """
+    if f"{PER_PATH}/scripts" not in sys.path:
+        sys.path.append(f"{PER_PATH}/scripts")
+    from generate import generate_outputs
+
+    random.seed() # forked workers share the parent's random state otherwise
+
+    config_files = [
+        json_file,
+        f"{PER_PATH}/examples/svo/middleman1.json",
+        f"{PER_PATH}/examples/svo/english1.json"
+        ]
+    lines = [sent + "\n" for sent in generate_outputs(config_files, num_sents, only_sents=True)]
+
+    with open(output_file, 'w') as f:
+        f.write("".join(lines))
+
+def get_prop(codes):
+    """
+    Computes the singleton proportion curve of codes (see encode_columns()), 
+    i.e. prop[i] = num singletons in codes[:i+1] / (i+1)
+    """
+    # np.unique gives the index of each code's first occurrence, 
+    # i.e. where a new singleton appears
+    _, first_idx = np.unique(codes, return_index=True)
+
+    is_first = np.zeros(len(codes), dtype=bool)
+    is_first[first_idx] = True
+
+    # count singletons straight into a float array and normalize in place
+    singleton_prop = np.cumsum(is_first, dtype=np.float64)
+    singleton_prop /= np.arange(1, len(codes) + 1)
+    return singleton_prop
+
+def process_output(file_path, file_name, dist, seed):
+    """
+    Reads one Testperanto output file and returns the part relevant to dist 
+    encoded with encode_columns(). That part is also written to file_name, unless 
+    file_name is None. Returns None if the file couldn't be read.
+    seed (a tuple of non-negative ints) seeds the noun shuffle, so results don't 
+    depend on which worker process handles the file.
+    Module-level so that it can be sent to worker processes.
+    """
+    store = PerantoTripleStore() 
+    try:
+        store.load_from_file(file_path)
+    except FileNotFoundError:
+        print(f"The file at path {file_path} was not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        return None
+    columns = store.get_columns(dist)
+    codes = encode_columns(columns)
+
+    if dist == 'nn': # nouns are shuffled, as in PerantoTripleStore.get_nouns()
+        order = np.random.default_rng(seed).permutation(len(codes))
+        codes = codes[order]
+        columns = [np.asarray(column, dtype=object)[order] for column in columns]
+
+    # write filtered content to files
+    if file_name is not None:
+        try:
+            # one line per row, items separated by spaces, written in one go
+            lines = "".join(" ".join(map(str, row)) + "\n" for row in zip(*columns))
+            with open(file_name, 'w', buffering=1 << 20) as file:
+                file.write(lines)
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+
+    return codes
 
 class Config:
     """
@@ -23,30 +165,40 @@ class Config:
     and a input_space, which is a dict mapping "Strength" and "Discount"
     to a list of strengths/discounts to search through. You also need 
     to specify a folder to save the data in, as well as a base json peranto
-    config file to reference (should be located in experiment_data/base_file)
+    config file to reference (should be located in experiment_data/base_file).
+    num_cores is the number of worker processes used to read peranto output
+    (defaults to the cpus this process may run on, e.g. the slurm allocation).
+    If save_modified is True, run() also saves the filtered peranto output 
+    (see Experiment.export_modified).
     """
     def __init__(self,
         distribution: str,
         input_space       = None,
         base_file  :  str = "basefile.json",
         data_folder:  str = "experiment",
-        child_dists: list = None
+        child_dists: list = None,
+        num_cores  :  int = None,
+        save_modified: bool = False
         ):
 
         self.distribution = distribution
 
         if input_space is None:
             input_space: dict = {
-            "Strength" : list(np.arange(0, 1050, 50)),
-            "Discount" : list(np.arange(0, 1, .1))
+            "Strength" : list(range(0, 1050, 50)),
+            "Discount" : [d / 10 for d in range(0, 10)]
             }
 
         self.input_space = input_space
         self.base_file   = base_file 
         self.data_folder = data_folder
+        if num_cores is None: # os.cpu_count() would count every cpu on the node
+            num_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        self.num_cores   = num_cores
+        self.save_modified = save_modified
 
         if child_dists is None:
-            self.child_dists = [distribution]
+            child_dists = [distribution]
             # child_dist_map = {
             #     'nn'          : ['nn', 'nn.arg0', 'nn.arg1', 'nn.arg0.$y0', 'nn.arg1.$y0'],
             #     'vb'          : ['vb'],
@@ -55,7 +207,8 @@ class Config:
             #     'nn.arg0.$y0' : ['nn.arg0.$y0'],
             #     'nn.arg1.$y0' : ['nn.arg1.$y0']
             #     }
-            #self.child_dists = child_dist_map[distribution]
+            #child_dists = child_dist_map[distribution]
+        self.child_dists = frozenset(child_dists)
 
 class Experiment:
     """
@@ -79,6 +232,8 @@ class Experiment:
     Once this shell script is created, one should run the sh script on appa:
         sbatch {dist}.sh
 
+    which calls exp.generate() (python experiment.py ... --generate).
+
     This script will create peranto_output/{dist}/peranto_{dist}_s{str}_d{dis}.txt, containing
     peranto output. This will take awhile (if num_sentences = 5897 ~ 2.5hr). Afterwards you should call
 
@@ -87,6 +242,8 @@ class Experiment:
     Run will do  things:
         (1) Cleans each peranto output file to be in the correct form
             - for example if dist == nn the cleaned file will only have nouns 
+            - only saved (to peranto_output/{dist} modified) if config.save_modified,
+              otherwise call exp.export_modified()
         (2) Computes the singleton proportion of each peranto output (along with treebank data)
         (3) Computes and saves the MSE between treebank and each peranto output
             - Saved in mse_results/{dist}_mse_results.txt
@@ -104,6 +261,10 @@ class Experiment:
         self.name        = self.dist.replace("$","")                # avoids sh scripts error 
         self.input_space = config.input_space 
         self.child_dists = config.child_dists
+        self.num_cores   = config.num_cores
+        self.data_folder = config.data_folder
+        self.base_name   = config.base_file
+        self.save_modified = config.save_modified
         self.num_pron    = (0.6981516025097507, 0.2518229608275394) # subj prop, obj prop
         self.store       = TripleStore()
         self.data_path   = f"{MAIN_PATH}/experiment_data/{config.data_folder}"
@@ -139,15 +300,13 @@ class Experiment:
             self.json_path,
             self.sh_path,
             f"{self.output_path}/{self.name}",
-            f"{self.output_path}/{self.name} modified",
             self.mse_path,
             self.plot_path
             ]
 
         ### create paths
         for path in paths:
-            if not os.path.exists(path):
-                os.makedirs(path)
+            os.makedirs(path, exist_ok=True)
 
         ### tune lvl1 before lvl2 before lvl3
         get_param_path = lambda dist : f"{self.data_path}/parameters/{dist}_params.txt"
@@ -165,19 +324,41 @@ class Experiment:
                 if not os.path.exists(get_param_path(dist)):
                     raise Exception(f"Please tune {dist} before {self.name}")
 
+    @functools.cached_property
+    def parameters(self):
+        """
+        All (S, D) pairs of the input space, as a dict mapping param_key(S, D) => (S, D).
+        The int keys are used for filenames and results, floats only for writing configs/results
+        """
+        inputs = self.input_space
+        return {param_key(strength, discount) : (float(strength), float(discount))
+                for strength, discount in itertools.product(inputs["Strength"], inputs["Discount"])}
+
+    @functools.cached_property
+    def saved_parameters(self):
+        """
+        The (S, D) pairs saved by create_param_space(), in the same form as self.parameters.
+        Used by steps that run in a later process (e.g. from the sh script), where
+        the Config's input_space may not be the one used for setup
+        """
+        with open(self.param_path, "r") as f:
+            pairs = [tuple(float(x) for x in line.split(",")) for line in f if line.strip()]
+        return {param_key(strength, discount) : (strength, discount) for strength, discount in pairs}
+
     def create_param_space(self):
         """
         Given input space {"Strength" : [strengths], "Discount" : [discounts]}
-        this function creates a parameters.txt file that contains all (S, D) pair
+        this function creates a parameters.txt file that contains all (S, D) pair.
+        The file is read back (see self.saved_parameters) by generate() and run(),
+        which usually happen in a later process with a default Config
         """
         # generate pairs
         inputs = self.input_space
-        pairs = [(strength, discount) for strength in inputs["Strength"] for discount in inputs["Discount"]]
+        pairs = itertools.product(inputs["Strength"], inputs["Discount"])
 
         # Create parameters.txt file and write in paramaters
         with open(self.param_path, "w") as f:
-            for pair in pairs:
-                f.write(f"{pair[0]}, {pair[1]}\n")
+            f.write("".join(f"{strength}, {discount}\n" for strength, discount in pairs))
 
     def create_json_configs(self):
         """
@@ -197,48 +378,47 @@ class Experiment:
             'nn.arg1.$y0' : ['nn.$y1.$y2']
             }
 
-        with open(self.param_path, "r") as f:
-            lines = f.readlines()
-            parameters = [(float(line.split(",")[0].strip()), float(line.split(",")[1].strip())) for line in lines]
-        
         # Read the original JSON content
-        with open(json_file_to_read, "r") as f:
-            json_content = json.load(f)
-
-        for strength, discount in parameters:
-            # modify pyor dists as appropriate
-            for dist in json_content["distributions"]:
-            # modify appropriate parameters, according to the distribution
-                if dist["name"] in self.child_dists:
-                    dist['strength'] = strength
-                    dist['discount'] = discount 
-
-            # set proportion of pronouns as appropriate  
-            for rule in json_content["rules"]:
-                if self.dist != 'vb' and rule['rule'] == "$qentity.$y1.$y2 -> (ENTITY $qnn.$y1.$z1 $qentitymods)":
-                    rule['zdists'] = zdists[self.dist]
-                if rule["rule"] == "$qnn.arg0.$y1 -> (inst nn.$y1)":
-                    rule["base_weight"] = float(1 - self.num_pron[0])
-                if rule["rule"] == "$qnn.arg0.$y1 -> (inst pron.$z1)":
-                    rule["base_weight"] = float(self.num_pron[0])
-                if rule["rule"] == "$qnn.arg1.$y1 -> (inst nn.$y1)":
-                    rule["base_weight"] = float(1-self.num_pron[1])
-                if rule["rule"] == "$qnn.arg1.$y1 -> (inst pron.$z1)":
-                    rule["base_weight"] = float(self.num_pron[1])
+        json_content = load_base_json(json_file_to_read)
+
+        # set proportion of pronouns as appropriate (doesn't depend on (S,D))
+        rule_handlers = {  # rule => (field, value)
+            "$qnn.arg0.$y1 -> (inst nn.$y1)"   : ("base_weight", float(1 - self.num_pron[0])),
+            "$qnn.arg0.$y1 -> (inst pron.$z1)" : ("base_weight", float(self.num_pron[0])),
+            "$qnn.arg1.$y1 -> (inst nn.$y1)"   : ("base_weight", float(1 - self.num_pron[1])),
+            "$qnn.arg1.$y1 -> (inst pron.$z1)" : ("base_weight", float(self.num_pron[1]))
+            }
+        if self.dist != 'vb':
+            rule_handlers["$qentity.$y1.$y2 -> (ENTITY $qnn.$y1.$z1 $qentitymods)"] = ("zdists", zdists[self.dist])
+
+        for rule in json_content["rules"]:
+            handler = rule_handlers.get(rule["rule"])
+            if handler is not None:
+                field, value = handler
+                rule[field] = value
+
+        # pyor dists to modify, according to the distribution
+        dist_refs = [dist for dist in json_content["distributions"] if dist["name"] in self.child_dists]
+
+        for (s, d), (strength, discount) in self.parameters.items():
+            for dist in dist_refs:
+                dist['strength'] = strength
+                dist['discount'] = discount 
             
             # Save the modified JSON content to a new file
-            new_file_name = f"{self.json_path}/{self.name}_amr_s{int(strength)}_d{int(discount*100)}.json"
-            with open(new_file_name, "w") as f:
-                json.dump(json_content, f, indent=4)
+            new_file_name = f"{self.json_path}/{self.name}_amr_s{s}_d{d}.json"
+            dump_json(json_content, new_file_name)
 
     def create_sh_script(self):
         """
-        runs the .sh script created by create_sh_script()
+        Creates the .sh script that generates peranto output for every json config.
+        The script calls this file with --generate, so testperanto is only imported
+        once per worker process rather than once per config.
         """
         script_name = f"{self.sh_path}/{self.name}.sh"
 
         shell_script_content = f"""#!/bin/sh
-        #SBATCH -c 64                # Request 64 CPU core
+        #SBATCH -c {SH_CORES}                # Request {SH_CORES} CPU core
         #SBATCH -t 0-02:00          # Runtime in D-HH:MM, minimum of 10 mins
         #SBATCH -p dl               # Partition to submit to 
         #SBATCH --mem=10G           # Request 10G of memory
@@ -246,20 +426,27 @@ class Experiment:
         #SBATCH -e error.err        # File to which STDERR will be written
         #SBATCH --gres=gpu:0        # Request 0 GPUs
 
-        JSON_PATH="{self.json_path}"
-        DATA_PATH="{self.output_path}"
-        PERANTO_PATH="{PER_PATH}"
-
-        find "$JSON_PATH" -name '{self.name}_amr_*.json' | xargs -I {{}} -P 64 bash -c '
-            json_file="$1"
-            strength=$(echo "$json_file" | grep -o -E "s[0-9]+" | sed "s/s//")
-            discount=$(echo "$json_file" | grep -o -E "d[0-9]+" | sed "s/d//")
-            python "'"$PERANTO_PATH"'/scripts/generate.py" -c "$json_file" "'"$PERANTO_PATH"'/examples/svo/middleman1.json" "'"$PERANTO_PATH"'/examples/svo/english1.json" --sents -n 5897 > "'"$DATA_PATH"'/{self.name}/peranto_{self.name}_s${{strength}}_d${{discount}}.txt"
-        ' _ {{}}
+        cd "{SRC_PATH}"
+        python experiment.py -d '{self.dist}' -f '{self.data_folder}' -b '{self.base_name}' -c {SH_CORES} --generate
         """
 
         with open(script_name, 'w') as script_file:
             script_file.write(shell_script_content)
+
+    def generate(self, num_sents=NUM_SENTS):
+        """
+        Generates peranto output for every json config created by create_json_configs(),
+        using self.num_cores worker processes. The (S, D) pairs are read from the 
+        parameters file written by setup. Output is saved to 
+        peranto_output/{dist}/peranto_{dist}_s{str}_d{dis}.txt
+        """
+        json_files, output_files = [], []
+        for s, d in self.saved_parameters:
+            json_files.append(f"{self.json_path}/{self.name}_amr_s{s}_d{d}.json")
+            output_files.append(f"{self.output_path}/{self.name}/peranto_{self.name}_s{s}_d{d}.txt")
+
+        with ProcessPoolExecutor(max_workers=self.num_cores) as executor:
+            list(executor.map(generate_output, json_files, output_files, [num_sents] * len(json_files)))
     
     def setup(self):
         """
@@ -272,55 +459,44 @@ class Experiment:
         self.create_sh_script()
         print(f'Experiment setup completed. Please run shell script on appa.')
 
-    def get_peranto_data(self):
+    def get_peranto_data(self, save_modified=None):
         """
-        Overwrites Testperanto generated output files to only contain relevant information
-        based on the distribution that is being tuned.
+        Reads Testperanto generated output files, keeping only relevant information
+        based on the distribution that is being tuned. Files are processed in parallel
+        across self.num_cores worker processes. If save_modified (defaults to 
+        self.save_modified) the filtered output is also saved to "{dist} modified".
         """
+        if save_modified is None:
+            save_modified = self.save_modified
+        if save_modified:
+            os.makedirs(f"{self.output_path}/{self.name} modified", exist_ok=True)
+
         peranto_data = {}
         # iterate through all files 
-        with open(self.param_path, "r") as f:
-            lines = f.readlines()
-            parameters = [(float(line.split(",")[0].strip()), float(line.split(",")[1].strip())) for line in lines]
-    
-        for strength, discount in parameters:
-            file_path = f"{self.output_path}/{self.name}/peranto_{self.name}_s{int(strength)}_d{int(100* discount)}.txt"
-            store = PerantoTripleStore() 
-            try:
-                with open(file_path, 'r') as file:
-                    for line in file.readlines():
-                        line = line.split()
-                        subject = line[0]
-                        verb = line[1]
-                        obj= line[2]
-                        store.add_triple(subject, verb, obj)      
-            except FileNotFoundError:
-                print(f"The file at path {file_path} was not found.")
-                return None
-            except Exception as e:
-                print(f"An error occurred: {str(e)}")
-
-                return None
-            stuff_to_write = store.get(self.dist)  
-            peranto_data[(strength, discount)] = stuff_to_write.copy()
-            # write filtered content to files
-
-            try:
-                file_name = f"{self.output_path}/{self.name} modified/peranto_{self.name}_s{int(strength)}_d{int(100* discount)}_modified.txt"
-                with open(file_name, 'w') as file:
-                    # Iterate through each tuple in the list
-                    for tup in stuff_to_write:
-                        # Iterate through each item in the tuple
-                        for item in tup:
-                            # Write each item on a line separated by space 
-                            file.write(str(item) + " ")
-                        # Add an newline for separation between tuples
-                        file.write("\n")
-            except Exception as e:
-                print(f"An error occurred: {str(e)}")
+        with ProcessPoolExecutor(max_workers=self.num_cores) as executor:
+            futures = {}
+            for s, d in self.saved_parameters:
+                file_path = f"{self.output_path}/{self.name}/peranto_{self.name}_s{s}_d{d}.txt"
+                file_name = None
+                if save_modified:
+                    file_name = f"{self.output_path}/{self.name} modified/peranto_{self.name}_s{s}_d{d}_modified.txt"
+                futures[(s, d)] = executor.submit(process_output, file_path, file_name, self.dist, (s, d))
+
+            for (s, d), future in futures.items():
+                stuff_to_write = future.result()
+                if stuff_to_write is None:
+                    return None
+                peranto_data[(s, d)] = stuff_to_write
 
         return peranto_data
 
+    def export_modified(self):
+        """
+        Saves the filtered peranto output files, i.e. only the relevant information 
+        for the distribution being tuned
+        """
+        self.get_peranto_data(save_modified=True)
+
     def get_singleton_prop(self):
         """
         Computes singleton proportion for treebank and generated data.
@@ -328,73 +504,77 @@ class Experiment:
         Then normalizes with len(data[:i]).
 
         Returns tuple of the form
-            {(str, dis) : [singleton prop], (str1, dis1) : [singleton prop1], ...},
+            {(s, d) : [singleton prop], (s1, d1) : [singleton prop1], ...},
             [singleton prop of treebank data]
+        where (s, d) = param_key(strength, discount)
         """
-        data = self.get_peranto_data() # {(strength, discount) : [(he, eat), (my, name), ...]} 
-
-        def get_prop(lst):
-            singleton_count = 0
-            seen = set()
-            singletons = []
-            total = []
-
-            if len(lst[0]) == 1: # self.dist in [nn, vb, nn.arg0, nn.arg1]
-                # the isinstance checks in case data is (strength, discount) : ['he', 'my', ...]
-                lst = [(x, x) for x in lst] # this just makes things convenient
-
-            for idx, (a, b) in enumerate(lst):
-                if (a, b) not in seen: # singleton
-                    singleton_count += 1
-                    seen.add((a, b))
-                singletons.append(singleton_count)
-                total.append(idx + 1)
-
-            singleton_prop = np.array(singletons) / np.array(total)
-            return singleton_prop
-
-        peranto_prop = {(str, dis) : get_prop(lst) for (str, dis), lst in data.items()}
-        treebank_prop = get_prop(self.store.get(self.dist))
+        data = self.get_peranto_data() # {(s, d) : encode_columns([[he, my, ...], [eat, name, ...]])} 
+
+        peranto_prop = {key : get_prop(codes) for key, codes in data.items()}
         
-        return peranto_prop, treebank_prop
+        return peranto_prop, self.treebank_prop
+
+    @functools.cached_property
+    def treebank_prop(self):
+        """
+        Singleton proportion of the treebank data for self.dist. The treebank 
+        doesn't change, so this is only computed once per Experiment.
+        """
+        return get_prop(encode_rows(self.store.get(self.dist)))
 
     def get_top_k(self, singleton_prop, treebank_prop, k=10):
         """
         Computes and saves the MSE between treebank prop and each 
         singleton_prop of generated data. Returns a list of the top
-        k (str, dis) params, measured by MSE. 
+        k (s, d) param keys, measured by MSE. Curves whose length differs
+        from the treebank's (e.g. from an unfinished generation job) are skipped. 
         """
-        def mse(x, y):
-            return np.mean((x-y)**2)
-
-        mse_results = {(str, dis) : mse(treebank_prop, sing_prop)
-                        for (str, dis), sing_prop in singleton_prop.items()}
+        keys = []
+        for key, sing_prop in singleton_prop.items():
+            if len(sing_prop) == len(treebank_prop):
+                keys.append(key)
+            else:
+                strength, discount = self.saved_parameters[key]
+                print(f"Skipping S={strength}, D={discount}: curve has length {len(sing_prop)}, "
+                      f"treebank has length {len(treebank_prop)}")
+
+        # stack curves into a (num params, n) array and compute all MSEs at once
+        mse_results = {}
+        if keys:
+            curves = np.vstack([singleton_prop[key] for key in keys])
+            mses = ((curves - treebank_prop[None, :]) ** 2).mean(axis=1)
+            mse_results = dict(zip(keys, mses))
+
+        top_k = heapq.nsmallest(k, mse_results.items(), key = lambda x : x[1])
 
         mse_results = sorted(mse_results.items(), key = lambda x : x[1]) # sort by mse
         try:
             file_path = f"{self.mse_path}/{self.name}_mse_results.txt"
             with open(file_path, 'w') as file:
-                for (strength, discount), mse in mse_results:
+                for key, mse in mse_results:
+                    strength, discount = self.saved_parameters[key]
                     file.write(f"S ={str(strength)}, D={str(discount)} MSE: {mse}")
                     file.write("\n")
 
         except Exception as e:
             print(f"An error occurred: {str(e)}")
-        res = [[(str, dis), mse] for (str, dis), mse in mse_results][:k]
-        return {x[0] : x[1] for x in res} #maps (str, dis) => mse
+        return dict(top_k) #maps (s, d) => mse
 
     def create_plot(self, singleton_prop, treebank_prop, best_params):
         """
         Creates and saves a plot of the singleton proportion curves of the 
-        top k (str, dis) pairs.
+        top k (s, d) param keys.
         """
+        import matplotlib.pyplot as plt # imported here since it is slow and only needed for plots
+
         plt.figure(figsize=(10, 6))
         
         data = {}
 
-        for (str, dis), mse in best_params.items():
-            curve = singleton_prop[(str, dis)]
-            name = f"S={str},D={round(dis, 3)},MSE={round(mse, 4)}"
+        for key, mse in best_params.items():
+            curve = singleton_prop[key]
+            strength, discount = self.saved_parameters[key]
+            name = f"S={strength},D={round(discount, 3)},MSE={round(mse, 4)}"
             data[name] = curve
         
         data["Treebank"] = treebank_prop
@@ -454,6 +634,20 @@ def main():
             help='If True, calls exp.run()'
             )
 
+    parser.add_argument(
+            '-g', '--generate',
+            action='store_true',
+            help='If True, calls exp.generate() (used by the sh script)'
+            )
+
+    parser.add_argument(
+            '-c', '--cores',
+            type=int,
+            required=False, 
+            default=None,
+            help='num worker processes (defaults to all cpus)'
+            )
+
     parser.add_argument(
             '-b', '--basefile',
             type=str,
@@ -475,13 +669,16 @@ def main():
     config = Config(
         args.distribution, 
         data_folder=args.folder,
-        base_file=args.basefile
+        base_file=args.basefile,
+        num_cores=args.cores
         )
     
     exp = Experiment(config)
 
     if args.setup:
         exp.setup()
+    elif args.generate:
+        exp.generate()
     else:
         exp.run(k=args.k)
 
@@ -492,5 +689,6 @@ if __name__ == "__main__":
 Usage:
 
 python experiment.py -d "nn" -f "new" -s (to setup)
+python experiment.py -d "nn" -f "new" -g (to generate peranto output, normally via the sh script)
 python experiment.py -d "nn" -f "new" -r (to run)
 """
\ No newline at end of file
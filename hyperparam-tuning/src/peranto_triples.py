@@ -6,20 +6,37 @@ class PerantoTripleStore:
     Basically a TripleStore where you 
     just add data and then are able to read different components of it
 
-    Similar to TripleStore functionality
+    Similar to TripleStore functionality, but the data is stored 
+    as one list per column (subject, verb, object) rather than one 
+    dict per triple
     """
     def __init__(self):
-        self.data = []    
+        self.data = {
+            'subject'  : [],
+            'verb'     : [],
+            'object'   : []
+            }
     
     def add_triple(self, s, v, o,):
-        self.data.append({
-            'subject'  : s,
-            'verb'     : v,
-            'object'   : o,
-            })
+        self.data['subject'].append(s)
+        self.data['verb'].append(v)
+        self.data['object'].append(o)
+
+    def load_from_file(self, filename):
+        """
+        Loads whitespace separated (subject, verb, object) lines, ignoring any 
+        further columns.
+        """
+        subjects, verbs, objects = self.data['subject'], self.data['verb'], self.data['object']
+        with open(filename, 'r') as file:
+            for line in file:
+                line = line.split()
+                subjects.append(line[0])
+                verbs.append(line[1])
+                objects.append(line[2])
     
     def _retrieve(self, parts):
-        return [tuple(item[part] for part in parts if part) for item in self.data]
+        return list(zip(*(self.data[part] for part in parts if part)))
 
     # Specific retrieval methods
     def get_triples(self):
@@ -47,24 +64,29 @@ class PerantoTripleStore:
         random.shuffle(result)
         return result
     
-    def get(self, distribution):
-        if distribution == 'vb':
-            return self.get_verbs()
-
-        elif distribution == 'nn':
-            return self.get_nouns()
-
-        elif distribution == 'nn.arg0':
-            return self.get_subjects()
+    def get_columns(self, distribution):
+        """
+        Like get(), but returns the data as a list of columns rather than a list
+        of tuples, e.g. [subjects, verbs] for nn.arg0.$y0. Nouns are not shuffled.
+        """
+        columns = {
+            'vb'          : ['verb'],
+            'nn.arg0'     : ['subject'],
+            'nn.arg1'     : ['object'],
+            'nn.arg0.$y0' : ['subject', 'verb'],
+            'nn.arg1.$y0' : ['verb', 'object']
+            }
+        if distribution == 'nn':
+            return [self.data['subject'] + self.data['object']]
 
-        elif distribution == 'nn.arg1':
-            return self.get_objects()
-
-        elif distribution == "nn.arg0.$y0":
-            return self.get_sv_pairs()
-        
-        elif distribution == 'nn.arg1.$y0':
-            return self.get_vo_pairs()
+        elif distribution in columns:
+            return [self.data[part] for part in columns[distribution]]
 
         else:
             raise Exception(f"Please enter a valid distribution. Note that my cousin TripleStore will not be as kind.")
+
+    def get(self, distribution):
+        result = list(zip(*self.get_columns(distribution)))
+        if distribution == 'nn':
+            random.shuffle(result)
+        return result
@@ -4,17 +4,23 @@ from testperanto.config import init_transducer_cascade
 from testperanto.globals import EMPTY_STR, DOT
 from testperanto.transducer import run_transducer_cascade
 
-def main(config_files, switching_code, num_to_generate, only_sents, vbox_theme, show_intermediate_trees):
+def generate_outputs(config_files, num_to_generate, switching_code=None, only_sents=False,
+                     vbox_theme="universal", show_intermediate_trees=False):
+    """Yields num_to_generate outputs of the cascade: sentences if only_sents, else pretty printed trees."""
     cascade = init_transducer_cascade(config_files, switching_code, vbox_theme=vbox_theme)
     for _ in tqdm(range(num_to_generate)):
         output = run_transducer_cascade(cascade, verbose=show_intermediate_trees)
         if only_sents:
             leaves = [DOT.join(leaf.get_label()) for leaf in output.get_leaves()]
             leaves = [leaf for leaf in leaves if leaf != EMPTY_STR]
-            output = ' '.join(leaves)
-            print(output)
+            yield ' '.join(leaves)
         else:
-            print(output.pretty_print())
+            yield output.pretty_print()
+
+def main(config_files, switching_code, num_to_generate, only_sents, vbox_theme, show_intermediate_trees):
+    for output in generate_outputs(config_files, num_to_generate, switching_code, only_sents,
+                                   vbox_theme, show_intermediate_trees):
+        print(output)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Generate trees using testperanto.')